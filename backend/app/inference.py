@@ -1,8 +1,24 @@
+import asyncio
+import hashlib
 import os
-from typing import Optional
+import random
+from typing import AsyncIterator, Awaitable, Callable, Optional, TypeVar
 
+import httpx
+import orjson
+from cachetools import TTLCache
 from dotenv import load_dotenv
-from huggingface_hub import InferenceClient
+from huggingface_hub import AsyncInferenceClient, InferenceClient
+from huggingface_hub.utils import (
+    HfHubHTTPError,
+    build_hf_headers,
+    hf_raise_for_status,
+    set_async_client_factory,
+)
+from huggingface_hub.utils._http import (
+    async_hf_request_event_hook,
+    async_hf_response_event_hook,
+)
 
 # Load environment variables from the project root ".env".
 ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
@@ -15,8 +31,42 @@ HF_MODEL_ID = os.getenv("HF_MODEL_ID", "meta-llama/Meta-Llama-3-8B-Instruct")
 if not HF_API_KEY:
     raise ValueError("HF_API_KEY is not set in environment variables or .env")
 
-# Global client instance, lazily initialized.
+# System message shared by every chat_completion call (never mutated).
+SYSTEM_PROMPT = "You are a helpful, cautious medical-style assistant."
+SYSTEM_MSG = {"role": "system", "content": SYSTEM_PROMPT}
+
+# Maximum number of LLM requests in flight at once, and retry policy for
+# transient upstream failures (rate limits, 5xx, timeouts).
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+LLM_MAX_ATTEMPTS = 3
+
+# Deterministic (temperature == 0) replies are cached in memory so repeated
+# questions skip the network round-trip entirely.
+LLM_CACHE_SIZE = 1024
+LLM_CACHE_TTL_SECONDS = 3600
+
+# Connection pool for the async client: one long-lived HTTP/2 client shared by
+# all in-flight LLM calls, so TLS/TCP handshakes are not repeated per request.
+LLM_HTTP_TIMEOUT = httpx.Timeout(60.0, connect=5.0)
+LLM_HTTP_MAX_CONNECTIONS = 64
+LLM_HTTP_MAX_KEEPALIVE_CONNECTIONS = 32
+
+# OpenAI-compatible chat endpoint of the HF router. AsyncInferenceClient sends
+# chat_completion calls for HF_MODEL_ID here; streams are posted to it directly.
+HF_CHAT_COMPLETIONS_URL = "https://router.huggingface.co/v1/chat/completions"
+
+# Send a 1-token request at startup so the first user does not pay for client
+# setup and the HF endpoint cold start. Set LLM_WARMUP=0 to disable.
+LLM_WARMUP = os.getenv("LLM_WARMUP", "1") != "0"
+LLM_WARMUP_TIMEOUT_SECONDS = 30.0
+
+# Global client instances, lazily initialized.
 _client: Optional[InferenceClient] = None
+_async_client: Optional[AsyncInferenceClient] = None
+_async_client_lock: Optional[asyncio.Lock] = None
+_stream_http: Optional[httpx.AsyncClient] = None
+_llm_sem: Optional[asyncio.Semaphore] = None
+_llm_cache: TTLCache = TTLCache(maxsize=LLM_CACHE_SIZE, ttl=LLM_CACHE_TTL_SECONDS)
 
 
 def get_client() -> InferenceClient:
@@ -32,36 +82,143 @@ def get_client() -> InferenceClient:
     return _client
 
 
-def call_llm(prompt: str, max_tokens: int = 512, temperature: float = 0.2) -> str:
+def _build_http_client() -> httpx.AsyncClient:
     """
-    Call a conversational LLM (e.g., Llama 3 8B Instruct) using the
-    chat_completion API. We send a simple system+user message and
-    return the assistant's reply as a plain string.
+    HTTP client factory used by AsyncInferenceClient.
 
-    max_tokens:
-        Maximum number of tokens to generate for this call.
-    temperature:
-        Sampling temperature used by the model.
+    The global AsyncInferenceClient asks for a session once and keeps it until
+    close_async_client(), so every request reuses this pool. The event hooks
+    are the ones huggingface_hub's default factory installs (request IDs,
+    HF_HUB_OFFLINE, reading error bodies of streamed responses).
     """
-    client = get_client()
-
-    messages = [
-        {
-            "role": "system",
-            "content": "You are a helpful, cautious medical-style assistant.",
+    return httpx.AsyncClient(
+        http2=True,
+        event_hooks={
+            "request": [async_hf_request_event_hook],
+            "response": [async_hf_response_event_hook],
         },
+        follow_redirects=True,
+        timeout=LLM_HTTP_TIMEOUT,
+        limits=httpx.Limits(
+            max_connections=LLM_HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=LLM_HTTP_MAX_KEEPALIVE_CONNECTIONS,
+        ),
+    )
+
+
+# The factory is replaced process-wide on purpose: AsyncInferenceClient has no
+# way to take a client instance, and this app is the only huggingface_hub user
+# in the process. The hooks above come from a private module, which is why
+# requirements.txt pins huggingface_hub to the minor versions checked here.
+set_async_client_factory(_build_http_client)
+
+
+async def get_async_client() -> AsyncInferenceClient:
+    """
+    Lazily initialize and return a global AsyncInferenceClient.
+
+    The client is created inside the running event loop (guarded by a lock)
+    so that concurrent first requests do not build several clients.
+    """
+    global _async_client, _async_client_lock
+    if _async_client is not None:
+        return _async_client
+
+    if _async_client_lock is None:
+        _async_client_lock = asyncio.Lock()
+
+    async with _async_client_lock:
+        if _async_client is None:
+            # AsyncInferenceClient passes its own timeout on every request,
+            # overriding the pool default, so hand it the same httpx.Timeout.
+            _async_client = AsyncInferenceClient(
+                model=HF_MODEL_ID, token=HF_API_KEY, timeout=LLM_HTTP_TIMEOUT
+            )
+    return _async_client
+
+
+async def warm_up_llm() -> None:
+    """
+    Create the async client and send a minimal request to the model so that
+    the connection and the HF endpoint are ready before the first user call.
+    Errors are raised to the caller.
+    """
+    client = await get_async_client()
+    await asyncio.wait_for(
+        client.chat_completion(
+            messages=[{"role": "user", "content": "ping"}],
+            max_tokens=1,
+            temperature=0.0,
+        ),
+        timeout=LLM_WARMUP_TIMEOUT_SECONDS,
+    )
+
+
+def _get_stream_http_client() -> httpx.AsyncClient:
+    """
+    Return the pooled httpx client used for streaming requests.
+
+    Streams are sent on this client directly instead of through
+    AsyncInferenceClient, which keeps every streamed response open on its
+    exit stack until the client itself is closed.
+    """
+    global _stream_http
+    if _stream_http is None:
+        _stream_http = _build_http_client()
+    return _stream_http
+
+
+async def close_async_client() -> None:
+    """Close the global AsyncInferenceClient and the connection pools."""
+    global _async_client, _stream_http
+    if _async_client is not None:
+        client, _async_client = _async_client, None
+        await client.close()
+    if _stream_http is not None:
+        http, _stream_http = _stream_http, None
+        await http.aclose()
+
+
+def _get_llm_semaphore() -> asyncio.Semaphore:
+    """
+    Return the global semaphore capping concurrent LLM calls.
+
+    Created on first use so that it is bound to the running event loop.
+    """
+    global _llm_sem
+    if _llm_sem is None:
+        _llm_sem = asyncio.Semaphore(LLM_MAX_CONCURRENCY)
+    return _llm_sem
+
+
+def _is_retryable(exc: Exception) -> bool:
+    """Rate limits, upstream 5xx and network/timeouts are worth retrying."""
+    if isinstance(exc, HfHubHTTPError):
+        response = getattr(exc, "response", None)
+        status = getattr(response, "status_code", None)
+        return status is None or status == 429 or status >= 500
+    return isinstance(exc, (asyncio.TimeoutError, httpx.HTTPError))
+
+
+def _cache_key(prompt: str, max_tokens: int) -> bytes:
+    """Compact cache key for a deterministic call to HF_MODEL_ID."""
+    raw = f"{HF_MODEL_ID}|{max_tokens}|{prompt}".encode("utf-8")
+    return hashlib.blake2b(raw, digest_size=16).digest()
+
+
+def _build_messages(prompt: str) -> list:
+    """Build the system+user message list sent to the chat_completion API."""
+    return [
+        SYSTEM_MSG,
         {
             "role": "user",
             "content": prompt,
         },
     ]
 
-    resp = client.chat_completion(
-      messages=messages,
-      max_tokens=max_tokens,
-      temperature=temperature,
-    )
 
+def _extract_content(resp) -> str:
+    """Extract the assistant's reply from a chat_completion response."""
     # Extract the content from the first choice.
     choice = resp.choices[0]
     msg = choice.message
@@ -73,3 +230,182 @@ def call_llm(prompt: str, max_tokens: int = 512, temperature: float = 0.2) -> st
         content = getattr(msg, "content", "")
 
     return content
+
+
+T = TypeVar("T")
+
+
+async def _with_retries(send: Callable[[], Awaitable[T]]) -> T:
+    """
+    Await send(), retrying transient failures up to LLM_MAX_ATTEMPTS times
+    with exponential backoff.
+    """
+    for attempt in range(LLM_MAX_ATTEMPTS):
+        try:
+            return await send()
+        except Exception as e:
+            if attempt == LLM_MAX_ATTEMPTS - 1 or not _is_retryable(e):
+                raise
+            await asyncio.sleep(0.5 * (2 ** attempt) + random.random() * 0.2)
+    raise AssertionError("unreachable")
+
+
+async def _chat_completion_with_retry(prompt: str, max_tokens: int, temperature: float):
+    """Send one chat_completion request through AsyncInferenceClient, with retries."""
+    client = await get_async_client()
+    messages = _build_messages(prompt)
+
+    return await _with_retries(
+        lambda: client.chat_completion(
+          messages=messages,
+          max_tokens=max_tokens,
+          temperature=temperature,
+        )
+    )
+
+
+async def _open_chat_stream(prompt: str, max_tokens: int, temperature: float) -> httpx.Response:
+    """
+    Open a streaming chat_completion request on the shared pool and return
+    the response once its status is OK. The caller must aclose() it.
+
+    URL, headers and payload match what AsyncInferenceClient sends for
+    call_llm_async(), plus "stream": true.
+    """
+    http = _get_stream_http_client()
+    request = http.build_request(
+        "POST",
+        HF_CHAT_COMPLETIONS_URL,
+        json={
+            "messages": _build_messages(prompt),
+            "model": HF_MODEL_ID,
+            "max_tokens": max_tokens,
+            "temperature": temperature,
+            "stream": True,
+        },
+        headers=build_hf_headers(token=HF_API_KEY),
+        timeout=LLM_HTTP_TIMEOUT,
+    )
+    response = await http.send(request, stream=True)
+    try:
+        hf_raise_for_status(response)
+    except BaseException:
+        await response.aclose()
+        raise
+    return response
+
+
+def _parse_stream_line(line: str) -> Optional[str]:
+    """
+    Return the text delta carried by one server-sent event line, or None if
+    the line carries no text. Raises StopIteration on "data: [DONE]" and
+    RuntimeError when the server reports an error mid-stream.
+    """
+    if not line.startswith("data:"):
+        return None
+    data = line[len("data:"):].strip()
+    if data == "[DONE]":
+        raise StopIteration
+    payload = orjson.loads(data)
+    if payload.get("error") is not None:
+        raise RuntimeError(f"LLM stream error: {payload['error']}")
+    choices = payload.get("choices")
+    if not choices:
+        return None
+    return (choices[0].get("delta") or {}).get("content")
+
+
+def call_llm(prompt: str, max_tokens: int = 512, temperature: float = 0.2) -> str:
+    """
+    Call a conversational LLM (e.g., Llama 3 8B Instruct) using the
+    chat_completion API. We send a simple system+user message and
+    return the assistant's reply as a plain string.
+
+    max_tokens:
+        Maximum number of tokens to generate for this call.
+    temperature:
+        Sampling temperature used by the model.
+    """
+    client = get_client()
+
+    resp = client.chat_completion(
+      messages=_build_messages(prompt),
+      max_tokens=max_tokens,
+      temperature=temperature,
+    )
+
+    return _extract_content(resp)
+
+
+async def call_llm_async(
+    prompt: str, max_tokens: int = 512, temperature: float = 0.2
+) -> str:
+    """
+    Async variant of call_llm() for use inside the FastAPI event loop.
+
+    The request is awaited on AsyncInferenceClient, so the server can keep
+    handling other requests while the model is generating. At most
+    LLM_MAX_CONCURRENCY calls run at once, and transient failures are
+    retried up to LLM_MAX_ATTEMPTS times with exponential backoff.
+
+    Replies to temperature == 0 calls are served from an in-memory TTL cache
+    when the same (prompt, max_tokens) was seen recently.
+    """
+    key = _cache_key(prompt, max_tokens) if temperature == 0.0 else None
+    if key is not None:
+        cached = _llm_cache.get(key)
+        if cached is not None:
+            return cached
+
+    async with _get_llm_semaphore():
+        resp = await _chat_completion_with_retry(prompt, max_tokens, temperature)
+
+    content = _extract_content(resp)
+    if key is not None:
+        _llm_cache[key] = content
+    return content
+
+
+async def call_llm_stream(
+    prompt: str, max_tokens: int = 512, temperature: float = 0.2
+) -> AsyncIterator[str]:
+    """
+    Streaming variant of call_llm_async(): yield the reply as text deltas
+    as soon as the model produces them.
+
+    The request goes straight to the shared httpx pool and the response is
+    closed when the generator finishes. Opening the stream is retried like
+    call_llm_async(); errors after the first token are raised to the caller.
+    The concurrency slot is held until the stream is finished. Cached
+    temperature == 0 replies are yielded as a single chunk, and complete
+    deterministic replies are cached.
+    """
+    key = _cache_key(prompt, max_tokens) if temperature == 0.0 else None
+    if key is not None:
+        cached = _llm_cache.get(key)
+        if cached is not None:
+            yield cached
+            return
+
+    parts = []
+    async with _get_llm_semaphore():
+        response = await _with_retries(
+            lambda: _open_chat_stream(prompt, max_tokens, temperature)
+        )
+        try:
+            async for line in response.aiter_lines():
+                try:
+                    delta = _parse_stream_line(line.strip())
+                except StopIteration:
+                    # "data: [DONE]"
+                    break
+                if delta:
+                    parts.append(delta)
+                    yield delta
+        finally:
+            # Closes the HTTP response even when [DONE] arrives before EOF
+            # or the consumer stops early.
+            await response.aclose()
+
+    if key is not None:
+        _llm_cache[key] = "".join(parts)
@@ -1,21 +1,95 @@
-import json
+import asyncio
+import hashlib
+import logging
+import re
+from contextlib import asynccontextmanager
 from pathlib import Path
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Union
 
-from fastapi import FastAPI, HTTPException
+import httpx
+import orjson
+from cachetools import TTLCache
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
-
-from .models import AskRequest, AskResponse, SafetyResult, SeverityInfo
+from fastapi.responses import Response, StreamingResponse
+from huggingface_hub.utils import HfHubHTTPError
+from pydantic import ValidationError
+from starlette.types import Scope
+
+from .models import (
+    AskBatchError,
+    AskBatchRequest,
+    AskBatchResponse,
+    AskRequest,
+    AskResponse,
+    SafetyResult,
+    SeverityInfo,
+)
 from .safety import safety_check
 from .prompts import build_prompt
-from .inference import call_llm
+from .inference import (
+    LLM_WARMUP,
+    call_llm_async,
+    call_llm_stream,
+    close_async_client,
+    warm_up_llm,
+)
+
+logger = logging.getLogger(__name__)
 
 # Base paths for static files
 BASE_DIR = Path(__file__).resolve().parent
 STATIC_DIR = BASE_DIR / "static"
 
+# The UI page is read once at import; restart the server after editing it.
+INDEX_PATH = STATIC_DIR / "index.html"
+INDEX_BYTES = INDEX_PATH.read_bytes()
+INDEX_ETAG = f'"{hashlib.md5(INDEX_BYTES, usedforsecurity=False).hexdigest()}"'
+
+# Static files whose name carries a content hash (e.g. app.3f9a1c2e.js) never
+# change under the same URL and can be cached forever; everything else must be
+# revalidated (ETag / Last-Modified) so UI updates show up immediately.
+_HASHED_ASSET_RE = re.compile(r"\.[0-9a-f]{8,}\.[A-Za-z0-9]+$")
+CACHE_CONTROL_IMMUTABLE = "public, max-age=31536000, immutable"
+CACHE_CONTROL_NO_CACHE = "no-cache"
+
+# Severity block emitted by the model: "###JSON###" followed (possibly after
+# some stray text) by a {...} object. Captures from the first "{" to the last "}".
+SEVERITY_MARKER = "###JSON###"
+_SEVERITY_RE = re.compile(r"###JSON###.*?(\{.*\})", re.DOTALL)
+
+# Short-lived cache of full /api/ask responses for identical deterministic requests.
+RESPONSE_CACHE_SIZE = 512
+RESPONSE_CACHE_TTL_SECONDS = 60
+_response_cache: TTLCache = TTLCache(maxsize=RESPONSE_CACHE_SIZE, ttl=RESPONSE_CACHE_TTL_SECONDS)
+
+EMERGENCY_ANSWER = (
+    "Your description contains signs that may indicate a medical emergency.\n\n"
+    "⚠ Please call your local emergency number or go to the nearest emergency "
+    "department immediately.\n\n"
+    "For safety reasons, this system will not provide further online analysis "
+    "or advice for potential emergency situations."
+)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Application lifespan: warm up the LLM on startup (unless LLM_WARMUP=0)
+    and close the shared LLM connection pool on shutdown.
+
+    A failed warm-up is logged and does not prevent the app from starting.
+    """
+    if LLM_WARMUP:
+        try:
+            await warm_up_llm()
+        except Exception:
+            logger.warning("LLM warm-up failed; continuing startup.", exc_info=True)
+    yield
+    await close_async_client()
+
+
 app = FastAPI(
     title="Medical Assistant (LLM + Safety Layer)",
     description=(
@@ -23,6 +97,7 @@ app = FastAPI(
         "implemented using FastAPI and a Hugging Face-hosted LLM."
     ),
     version="0.2.0",
+    lifespan=lifespan,
 )
 
 # Enable CORS for frontend usage (you can restrict origins in production).
@@ -34,8 +109,30 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+
+class CachedStaticFiles(StaticFiles):
+    """
+    StaticFiles that adds Cache-Control headers: long-lived and immutable for
+    content-hashed assets, "no-cache" (always revalidate) for the rest.
+    """
+
+    def file_response(
+        self,
+        full_path,
+        stat_result,
+        scope: Scope,
+        status_code: int = 200,
+    ) -> Response:
+        response = super().file_response(full_path, stat_result, scope, status_code)
+        if _HASHED_ASSET_RE.search(str(full_path)):
+            response.headers["Cache-Control"] = CACHE_CONTROL_IMMUTABLE
+        else:
+            response.headers["Cache-Control"] = CACHE_CONTROL_NO_CACHE
+        return response
+
+
 # Mount static files under /static instead of /
-app.mount("/static", StaticFiles(directory=STATIC_DIR), name="static")
+app.mount("/static", CachedStaticFiles(directory=STATIC_DIR), name="static")
 
 
 @app.get("/health")
@@ -48,12 +145,15 @@ async def health_check() -> Dict[str, str]:
 
 
 @app.get("/")
-async def serve_index() -> FileResponse:
+async def serve_index(request: Request) -> Response:
     """
-    Serve the main HTML page for the web UI.
+    Serve the main HTML page for the web UI from memory (no filesystem access
+    per request). Browsers revalidate with the ETag and get 304 if unchanged.
     """
-    index_path = STATIC_DIR / "index.html"
-    return FileResponse(index_path)
+    headers = {"Cache-Control": CACHE_CONTROL_NO_CACHE, "ETag": INDEX_ETAG}
+    if request.headers.get("if-none-match") == INDEX_ETAG:
+        return Response(status_code=304, headers=headers)
+    return Response(content=INDEX_BYTES, media_type="text/html", headers=headers)
 
 
 def parse_severity_json(raw_output: str) -> tuple[str, Optional[SeverityInfo]]:
@@ -68,28 +168,23 @@ def parse_severity_json(raw_output: str) -> tuple[str, Optional[SeverityInfo]]:
         ###JSON###{"severity": "...", ...}
 
     If parsing fails, the entire output is treated as answer text and
-    severity_info is None.
+    severity_info is None. A JSON block that does not match SeverityInfo
+    (e.g. an unknown severity level) also yields severity_info=None.
     """
-    marker = "###JSON###"
-    idx = raw_output.find(marker)
-    if idx == -1:
-        # No JSON marker found, return the whole text as the answer.
-        return raw_output.strip(), None
+    m = _SEVERITY_RE.search(raw_output)
+    if m is None:
+        idx = raw_output.find(SEVERITY_MARKER)
+        if idx == -1:
+            # No JSON marker found, return the whole text as the answer.
+            return raw_output.strip(), None
+        # Marker present but no {...} block after it.
+        return raw_output[:idx].strip(), None
 
-    answer_text = raw_output[:idx].strip()
-    json_candidate = raw_output[idx + len(marker):].strip()
-
-    # Try to extract the first {...} block.
-    start = json_candidate.find("{")
-    end = json_candidate.rfind("}")
-    if start == -1 or end == -1 or end <= start:
-        return answer_text, None
-
-    json_str = json_candidate[start: end + 1]
+    answer_text = raw_output[:m.start()].strip()
 
     try:
-        data: Dict[str, Any] = json.loads(json_str)
-    except Exception:
+        data: Dict[str, Any] = orjson.loads(m.group(1))
+    except orjson.JSONDecodeError:
         return answer_text, None
 
     severity = data.get("severity")
@@ -97,29 +192,108 @@ def parse_severity_json(raw_output: str) -> tuple[str, Optional[SeverityInfo]]:
     time_window = data.get("time_window")
     risk_notes = data.get("risk_notes")
 
-    severity_info = SeverityInfo(
-        severity=severity,
-        recommended_action=recommended_action,
-        time_window=time_window,
-        risk_notes=risk_notes,
-    )
+    try:
+        severity_info = SeverityInfo(
+            severity=severity,
+            recommended_action=recommended_action,
+            time_window=time_window,
+            risk_notes=risk_notes,
+        )
+    except ValidationError:
+        # e.g. {"severity": "medium"}: keep the answer, drop the block.
+        return answer_text, None
     return answer_text, severity_info
 
 
+def generation_params(request: AskRequest) -> tuple[float, int]:
+    """
+    Resolve temperature and max_tokens from the request, applying defaults
+    and clamping both to safe ranges.
+    """
+    temperature = request.temperature if request.temperature is not None else 0.2
+    max_tokens = request.max_tokens if request.max_tokens is not None else 512
+
+    # Clamp values to safe ranges (AskRequest already validates them, so this
+    # only guards callers that build requests without validation).
+    temperature = max(0.0, min(temperature, 1.5))
+    max_tokens = max(64, min(max_tokens, 1024))
+    return temperature, max_tokens
+
+
+def llm_error_to_http(exc: Exception) -> HTTPException:
+    """
+    Map an exception raised while calling the LLM to the HTTP error returned
+    to the client, and log the details server-side:
+
+        - upstream rate limit (HTTP 429) -> 429, so clients can back off
+        - timeouts                       -> 504
+        - anything else                  -> 502
+    """
+    logger.error("Error calling LLM", exc_info=exc)
+
+    if isinstance(exc, HfHubHTTPError):
+        response = getattr(exc, "response", None)
+        if getattr(response, "status_code", None) == 429:
+            return HTTPException(status_code=429, detail="LLM rate limit reached, please retry later.")
+        return HTTPException(status_code=502, detail="Upstream LLM error.")
+    if isinstance(exc, (asyncio.TimeoutError, httpx.TimeoutException)):
+        return HTTPException(status_code=504, detail="LLM timeout.")
+    return HTTPException(status_code=502, detail="Upstream LLM error.")
+
+
+def sse_event(event: str, data: bytes) -> bytes:
+    """Encode one server-sent event with a JSON payload."""
+    return b"event: " + event.encode("ascii") + b"\ndata: " + data + b"\n\n"
+
+
 @app.post("/api/ask", response_model=AskResponse)
-async def ask_medical(request: AskRequest) -> AskResponse:
+async def ask_medical(request: AskRequest, debug: bool = False) -> AskResponse:
     """
     Main endpoint for medical-style questions.
 
-    Flow:
-        1. Run a keyword-based safety check on the raw user question.
-        2. If the safety check classifies it as an emergency:
-              - return an emergency warning and do NOT call the LLM.
-        3. Otherwise:
-              - build a task-specific prompt (medical Q&A, diagnosis, drug, lab, education),
-              - call the LLM with optional temperature and max_tokens overrides,
-              - parse the JSON severity block (if present),
-              - return the answer plus the safety info and severity info.
+    Pass ?debug=true to also get the full prompt back in `used_prompt`.
+    """
+    return await _handle_ask(request, debug)
+
+
+@app.post("/api/ask_batch", response_model=AskBatchResponse)
+async def ask_medical_batch(body: AskBatchRequest, debug: bool = False) -> AskBatchResponse:
+    """
+    Answer several questions concurrently.
+
+    Each entry goes through the same pipeline as /api/ask; the LLM calls run
+    in parallel, bounded by LLM_MAX_CONCURRENCY. A failing entry is returned
+    as {"status_code": ..., "detail": ...} without failing the whole batch.
+    """
+    results = await asyncio.gather(
+        *(_handle_ask(r, debug) for r in body.requests), return_exceptions=True
+    )
+
+    responses = []
+    for result in results:
+        if isinstance(result, HTTPException):
+            responses.append(AskBatchError(status_code=result.status_code, detail=result.detail))
+        elif isinstance(result, Exception):
+            logger.error("Unhandled error in /api/ask_batch entry", exc_info=result)
+            responses.append(AskBatchError(status_code=500, detail="Internal server error."))
+        elif isinstance(result, BaseException):
+            # e.g. CancelledError: not a per-entry failure.
+            raise result
+        else:
+            responses.append(result)
+    return AskBatchResponse(responses=responses)
+
+
+def _prepare_ask(
+    request: AskRequest,
+) -> Union[AskResponse, tuple[SafetyResult, str, float, int]]:
+    """
+    Validate the question, run the safety check and build the prompt: the
+    steps shared by /api/ask and /api/ask/stream before the LLM call.
+
+    Returns the emergency AskResponse when the question must not reach the
+    LLM (the caller returns it as-is), otherwise
+    (safety_result, prompt, temperature, max_tokens).
     """
     question = request.question.strip()
     if not question:
@@ -132,13 +306,7 @@ async def ask_medical(request: AskRequest) -> AskResponse:
     # 2. If emergency -> short-circuit and do not call the LLM.
     if level == "emergency":
         return AskResponse(
-            answer=(
-                "Your description contains signs that may indicate a medical emergency.\n\n"
-                "⚠ Please call your local emergency number or go to the nearest emergency "
-                "department immediately.\n\n"
-                "For safety reasons, this system will not provide further online analysis "
-                "or advice for potential emergency situations."
-            ),
+            answer=EMERGENCY_ANSWER,
             safety=safety_result,
             severity=None,
             used_prompt=None,
@@ -151,26 +319,111 @@ async def ask_medical(request: AskRequest) -> AskResponse:
         language=request.language,
     )
 
-    # 4. Determine temperature and max_tokens from the request (with sane defaults).
-    temperature = request.temperature if request.temperature is not None else 0.2
-    max_tokens = request.max_tokens if request.max_tokens is not None else 512
+    # Determine temperature and max_tokens from the request (with sane defaults).
+    temperature, max_tokens = generation_params(request)
+    return safety_result, prompt, temperature, max_tokens
 
-    # Clamp values to safe ranges.
-    temperature = max(0.0, min(temperature, 1.5))
-    max_tokens = max(64, min(max_tokens, 1024))
 
-    # 5. Call the LLM.
+async def _handle_ask(request: AskRequest, debug: bool) -> AskResponse:
+    """
+    Answer one medical-style question (shared by /api/ask and /api/ask_batch).
+
+    Flow:
+        1. Run a keyword-based safety check on the raw user question.
+        2. If the safety check classifies it as an emergency:
+              - return an emergency warning and do NOT call the LLM.
+        3. Otherwise:
+              - build a task-specific prompt (medical Q&A, diagnosis, drug, lab, education),
+              - call the LLM with optional temperature and max_tokens overrides,
+              - parse the JSON severity block (if present),
+              - return the answer plus the safety info and severity info.
+
+    Steps 1-3 up to the prompt are shared with /api/ask/stream via _prepare_ask().
+
+    With debug=True the full prompt is included in `used_prompt`.
+
+    Deterministic (temperature == 0) answers are kept for a short time, so
+    retries and double submits of the same question return immediately.
+    """
+    prepared = _prepare_ask(request)
+    if isinstance(prepared, AskResponse):
+        return prepared
+    safety_result, prompt, temperature, max_tokens = prepared
+
+    cache_key = None
+    if temperature == 0.0:
+        # The prompt already encodes task type, language and question.
+        cache_key = (prompt, max_tokens, debug)
+        cached = _response_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+    # 4. Call the LLM.
     try:
-        raw_output = call_llm(prompt, max_tokens=max_tokens, temperature=temperature)
+        raw_output = await call_llm_async(prompt, max_tokens=max_tokens, temperature=temperature)
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error calling LLM: {e}")
+        raise llm_error_to_http(e) from e
 
-    # 6. Split into human-readable answer + severity JSON.
+    # 5. Split into human-readable answer + severity JSON.
     answer_text, severity_info = parse_severity_json(raw_output)
 
-    return AskResponse(
+    response = AskResponse(
         answer=answer_text,
         safety=safety_result,
         severity=severity_info,
-        used_prompt=prompt,
+        used_prompt=prompt if debug else None,
     )
+    if cache_key is not None:
+        _response_cache[cache_key] = response
+    return response
+
+
+@app.post("/api/ask/stream")
+async def ask_medical_stream(request: AskRequest, debug: bool = False) -> StreamingResponse:
+    """
+    Streaming version of /api/ask, returned as server-sent events.
+
+    Events:
+        - "token": {"text": "..."} for each piece of generated text, as soon
+          as the model produces it (the raw ###JSON### block included).
+        - "done": the final AskResponse, with the answer text and severity
+          parsed from the complete output exactly like /api/ask.
+        - "error": {"status_code": ..., "detail": "..."} if the LLM call fails;
+          status codes follow /api/ask (429, 502 or 504).
+
+    Emergencies are answered with a single "done" event and no LLM call.
+    """
+    prepared = _prepare_ask(request)
+    if isinstance(prepared, AskResponse):
+        return StreamingResponse(
+            iter([sse_event("done", prepared.model_dump_json().encode("utf-8"))]),
+            media_type="text/event-stream",
+        )
+    safety_result, prompt, temperature, max_tokens = prepared
+
+    async def events():
+        parts = []
+        try:
+            async for delta in call_llm_stream(
+                prompt, max_tokens=max_tokens, temperature=temperature
+            ):
+                parts.append(delta)
+                yield sse_event("token", orjson.dumps({"text": delta}))
+        except Exception as e:
+            error = llm_error_to_http(e)
+            yield sse_event(
+                "error",
+                orjson.dumps({"status_code": error.status_code, "detail": error.detail}),
+            )
+            return
+
+        answer_text, severity_info = parse_severity_json("".join(parts))
+        response = AskResponse(
+            answer=answer_text,
+            safety=safety_result,
+            severity=severity_info,
+            used_prompt=prompt if debug else None,
+        )
+        yield sse_event("done", response.model_dump_json().encode("utf-8"))
+
+    return StreamingResponse(events(), media_type="text/event-stream")
@@ -1,6 +1,6 @@
-from typing import Literal, Optional
+from typing import List, Literal, Optional, Union
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 
 from .prompts import TaskType
 from .safety import SafetyLevel
@@ -18,11 +18,20 @@ class AskRequest(BaseModel):
         - "education": health education and lifestyle advice
 
     temperature:
-        Optional override for the model sampling temperature.
+        Optional override for the model sampling temperature (0.0-1.5).
     max_tokens:
-        Optional override for the maximum number of tokens to generate.
+        Optional override for the maximum number of tokens to generate (64-1024).
+
+    Unknown fields and out-of-range values are rejected with HTTP 422.
     """
-    question: str = Field(..., description="User's medical question or symptom description.")
+    model_config = ConfigDict(extra="forbid")
+
+    question: str = Field(
+        ...,
+        min_length=1,
+        max_length=4096,
+        description="User's medical question or symptom description.",
+    )
     task_type: TaskType = Field(
         "medical_qa",
         description="Type of task: medical_qa, diagnosis, drug, lab, education.",
@@ -33,10 +42,14 @@ class AskRequest(BaseModel):
     )
     temperature: Optional[float] = Field(
         None,
+        ge=0.0,
+        le=1.5,
         description="Optional sampling temperature for the LLM.",
     )
     max_tokens: Optional[int] = Field(
         None,
+        ge=64,
+        le=1024,
         description="Optional maximum number of tokens to generate.",
     )
 
@@ -74,8 +87,39 @@ class AskResponse(BaseModel):
         None,
         description="Model-based structured risk assessment (parsed from JSON).",
     )
-    # Optional: for debugging or report-writing, you can inspect the prompt used.
+    # Optional: for debugging or report-writing, call /api/ask?debug=true
+    # to inspect the prompt used.
     used_prompt: Optional[str] = Field(
         None,
-        description="The full prompt sent to the LLM (for debugging / analysis).",
+        description="The full prompt sent to the LLM (only returned with ?debug=true).",
+    )
+
+
+class AskBatchRequest(BaseModel):
+    """
+    Request body for the /api/ask_batch endpoint: several /api/ask requests
+    answered concurrently.
+    """
+    model_config = ConfigDict(extra="forbid")
+
+    requests: List[AskRequest] = Field(
+        ...,
+        min_length=1,
+        max_length=32,
+        description="Questions to answer, each with the same fields as /api/ask.",
     )
+
+
+class AskBatchError(BaseModel):
+    """
+    Error entry returned in place of an AskResponse when one question fails.
+    """
+    status_code: int
+    detail: str
+
+
+class AskBatchResponse(BaseModel):
+    """
+    Response body for the /api/ask_batch endpoint, in request order.
+    """
+    responses: List[Union[AskResponse, AskBatchError]]
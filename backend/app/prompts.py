@@ -1,4 +1,4 @@
-from typing import Literal
+from typing import Dict, Literal, Tuple
 
 # The supported task types in your application.
 TaskType = Literal["medical_qa", "diagnosis", "drug", "lab", "education"]
@@ -16,60 +16,44 @@ You must always:
 """
 
 
-def build_prompt(task_type: TaskType, user_question: str, language: str = "zh") -> str:
-    """
-    Build a task-specific prompt for the LLM.
+LANGUAGE_INSTRUCTIONS: Dict[str, str] = {
+    "zh": (
+        "Please answer in Simplified Chinese (简体中文), unless the user clearly "
+        "uses another language."
+    ),
+    "en": "Please answer in English.",
+}
 
-    language:
-        - "zh": answer in Simplified Chinese
-        - "en": answer in English
+TASK_INSTRUCTIONS: Dict[str, str] = {
+    "medical_qa": (
+        "Task: Provide general medical information and suggestions based on the user's question. "
+        "Focus on explaining possible causes, typical work-up, and when to see a doctor."
+    ),
+    "diagnosis": (
+        "Task: Provide diagnostic-style reasoning (chain-of-thought). Explain possible causes "
+        "and differential diagnoses, but clearly state that this is NOT a formal diagnosis and "
+        "that only a licensed clinician can diagnose and treat."
+    ),
+    "drug": (
+        "Task: Provide information about medications (indications, common side effects, "
+        "precautions, interactions). Do NOT prescribe any medications. Always remind the user "
+        "to consult a doctor or pharmacist before taking or changing medicines."
+    ),
+    "lab": (
+        "Task: Provide a general interpretation of lab or imaging results. Explain what the "
+        "values or findings might mean, possible causes, and when further evaluation is needed. "
+        "Do not make definitive diagnoses."
+    ),
+    "education": (
+        "Task: Provide health education and lifestyle advice (prevention, long-term management, "
+        "self-care). Keep the advice practical, realistic, and conservative."
+    ),
+    "_default": (
+        "Task: Provide general medical-style information based on the user's question."
+    ),
+}
 
-    IMPORTANT:
-        At the end of the answer, the model must output a single-line JSON
-        block prefixed with '###JSON###' describing the severity assessment.
-    """
-    if language == "zh":
-        lang_instruction = (
-            "Please answer in Simplified Chinese (简体中文), unless the user clearly "
-            "uses another language."
-        )
-    else:
-        lang_instruction = "Please answer in English."
-
-    if task_type == "medical_qa":
-        task_instruction = (
-            "Task: Provide general medical information and suggestions based on the user's question. "
-            "Focus on explaining possible causes, typical work-up, and when to see a doctor."
-        )
-    elif task_type == "diagnosis":
-        task_instruction = (
-            "Task: Provide diagnostic-style reasoning (chain-of-thought). Explain possible causes "
-            "and differential diagnoses, but clearly state that this is NOT a formal diagnosis and "
-            "that only a licensed clinician can diagnose and treat."
-        )
-    elif task_type == "drug":
-        task_instruction = (
-            "Task: Provide information about medications (indications, common side effects, "
-            "precautions, interactions). Do NOT prescribe any medications. Always remind the user "
-            "to consult a doctor or pharmacist before taking or changing medicines."
-        )
-    elif task_type == "lab":
-        task_instruction = (
-            "Task: Provide a general interpretation of lab or imaging results. Explain what the "
-            "values or findings might mean, possible causes, and when further evaluation is needed. "
-            "Do not make definitive diagnoses."
-        )
-    elif task_type == "education":
-        task_instruction = (
-            "Task: Provide health education and lifestyle advice (prevention, long-term management, "
-            "self-care). Keep the advice practical, realistic, and conservative."
-        )
-    else:
-        task_instruction = (
-            "Task: Provide general medical-style information based on the user's question."
-        )
-
-    severity_instruction = """
+SEVERITY_INSTRUCTION = """
 After you finish the full human-readable answer, on a new line output:
 ###JSON### followed by a single-line JSON object with this exact schema:
 
@@ -83,17 +67,33 @@ After you finish the full human-readable answer, on a new line output:
 Do NOT explain the JSON. Do NOT add extra text after the JSON. The JSON must be valid.
 """
 
-    full_prompt = f"""{BASE_SYSTEM_PROMPT}
+# Everything before the user question only depends on (task_type, language),
+# so the prefixes are assembled once at import time.
+PROMPT_PREFIX: Dict[Tuple[str, str], str] = {
+    (task, lang): f"{BASE_SYSTEM_PROMPT}\n\n{lang_instruction}\n\n{task_instruction}"
+    for task, task_instruction in TASK_INSTRUCTIONS.items()
+    for lang, lang_instruction in LANGUAGE_INSTRUCTIONS.items()
+}
 
-{lang_instruction}
+PROMPT_TRAILER = (
+    "Now provide your answer in a clear, structured format, with headings and bullet points "
+    f"when helpful.\n{SEVERITY_INSTRUCTION}\n"
+)
 
-{task_instruction}
 
-User question:
-\"\"\"{user_question}\"\"\"
+def build_prompt(task_type: TaskType, user_question: str, language: str = "zh") -> str:
+    """
+    Build a task-specific prompt for the LLM.
 
-Now provide your answer in a clear, structured format, with headings and bullet points when helpful.
-{severity_instruction}
-"""
+    language:
+        - "zh": answer in Simplified Chinese
+        - "en": answer in English
+
+    IMPORTANT:
+        At the end of the answer, the model must output a single-line JSON
+        block prefixed with '###JSON###' describing the severity assessment.
+    """
+    lang = "zh" if language == "zh" else "en"
+    prefix = PROMPT_PREFIX.get((task_type, lang)) or PROMPT_PREFIX[("_default", lang)]
 
-    return full_prompt
+    return f'{prefix}\n\nUser question:\n"""{user_question}"""\n\n{PROMPT_TRAILER}'
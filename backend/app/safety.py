@@ -1,30 +1,186 @@
-from typing import Literal, Tuple, List
+from bisect import bisect_left
+from typing import Dict, FrozenSet, Literal, Set, Tuple, List
 import re
 
+import ahocorasick
+
 SafetyLevel = Literal["safe", "warning", "emergency"]
 
+# A sentence is a run of text between English / Chinese delimiters.
+_SENTENCE_RE = re.compile(r"[^\.!\?\n。！？]+")
+
 
-def split_sentences(text: str) -> List[str]:
+def sentence_spans(text_lower: str) -> List[Tuple[int, int]]:
     """
     Very simple sentence splitter for English + Chinese.
-    We lowercase everything to simplify matching.
+
+    Return the (start, end) offsets of each non-empty sentence, with
+    surrounding whitespace stripped, inside the already-lowercased text.
+    """
+    spans = []
+    for m in _SENTENCE_RE.finditer(text_lower):
+        part = m.group()
+        stripped = part.strip()
+        if stripped:
+            start = m.start() + len(part) - len(part.lstrip())
+            spans.append((start, start + len(stripped)))
+    return spans
+
+
+NEG_WORDS = ("no ", "without ", "denies ", "haven't ", "hasn't ", "没有", "無", "无", "沒有")
+
+
+# =============================
+# Keyword lists (all lowercase)
+# =============================
+CHEST_PAIN_TERMS = ("chest pain", "胸痛")
+RADIATING_TERMS = (
+    "left arm",
+    "jaw",
+    "radiat",
+    "back",
+    "shoulder",
+    "左臂",
+    "下颌",
+    "后背",
+    "肩",
+)
+SOB_TERMS = ("shortness of breath", "short of breath", "气短", "呼吸困难")
+SWEATING_TERMS = ("sweating", "cold sweat", "大汗")
+
+SEVERE_BREATHING_TERMS = (
+    "can't breathe",
+    "cannot breathe",
+    "unable to breathe",
+    "喘不过来",
+    "呼吸不过来",
+    "严重呼吸困难",
+)
+GI_BLEEDING_TERMS = ("vomiting blood", "bloody vomit", "black stool", "tarry stool", "呕血", "黑便")
+STROKE_TERMS = (
+    "sudden weakness on one side",
+    "face drooping",
+    "slurred speech",
+    "突然说不出话",
+    "一侧肢体无力",
+    "口角歪斜",
+)
+SUICIDE_TERMS = ("kill myself", "end my life", "suicide", "自杀", "想死")
+WARNING_TERMS = (
+    "shortness of breath",
+    "short of breath",
+    "blood in stool",
+    "black stool",
+    "vomiting blood",
+    "unintentional weight loss",
+    "severe pain",
+    "chest tightness",
+    "气短",
+    "便血",
+    "体重下降",
+    "胸闷",
+)
+
+KEYWORD_CATEGORIES: Dict[str, Tuple[str, ...]] = {
+    "negation": NEG_WORDS,
+    "chest_pain": CHEST_PAIN_TERMS,
+    "radiating": RADIATING_TERMS,
+    "sob": SOB_TERMS,
+    "sweating": SWEATING_TERMS,
+    "severe_breathing": SEVERE_BREATHING_TERMS,
+    "gi_bleeding": GI_BLEEDING_TERMS,
+    "stroke": STROKE_TERMS,
+    "suicide": SUICIDE_TERMS,
+    "warning": WARNING_TERMS,
+}
+
+CHEST_PAIN_FEATURES = frozenset({"radiating", "sob", "sweating"})
+
+# Rules evaluated per sentence; without one of these in the text the sentence
+# split can be skipped entirely.
+SENTENCE_RULE_CATEGORIES = frozenset({"chest_pain", "gi_bleeding"})
+
+# Cheap pre-check: every keyword that can trigger a rule on its own (chest pain,
+# severe breathing, GI bleeding, stroke, suicide, warning) contains at least one
+# of these substrings. Text without any of them is safe and skips the full scan.
+# Keep this in sync when adding keywords above.
+_QUICK_TRIGGERS = (
+    "pain",
+    "breath",
+    "blood",
+    "stool",
+    "kill",
+    "suicide",
+    "end my life",
+    "weight",
+    "tight",
+    "droop",
+    "slur",
+    "weakness",
+    "胸",
+    "血",
+    "便",
+    "死",
+    "自",
+    "喘",
+    "呼吸",
+    "气短",
+    "体重",
+    "无力",
+    "歪",
+    "说不出话",
+)
+
+SAFE_RESULT: Tuple[SafetyLevel, str] = (
+    "safe",
+    "No emergency features detected. This tool provides general health information only.",
+)
+
+
+def build_automaton() -> ahocorasick.Automaton:
+    """
+    Build one Aho-Corasick automaton over every keyword list, so a single
+    pass over the text finds all hits. Each keyword maps to
+    (categories, keyword); a keyword may belong to several categories.
     """
-    text_lower = text.lower()
-    parts = re.split(r"[\.!\?\n。！？]+", text_lower)
-    return [p.strip() for p in parts if p.strip()]
+    categories: Dict[str, Set[str]] = {}
+    for category, words in KEYWORD_CATEGORIES.items():
+        for word in words:
+            categories.setdefault(word, set()).add(category)
+
+    automaton = ahocorasick.Automaton()
+    for word, cats in categories.items():
+        automaton.add_word(word, (frozenset(cats), word))
+    automaton.make_automaton()
+    return automaton
+
 
+AUTOMATON = build_automaton()
 
-NEG_WORDS = ["no ", "without ", "denies ", "haven't ", "hasn't ", "没有", "無", "无", "沒有"]
 
+def sentence_categories(
+    text_lower: str, hits: List[Tuple[int, Tuple[FrozenSet[str], str]]]
+) -> List[Set[str]]:
+    """
+    Bucket automaton hits into sentences and return the set of categories
+    found in each sentence. Hits are only counted when they lie fully inside
+    a stripped sentence from sentence_spans().
+    """
+    spans = sentence_spans(text_lower)
+    sentence_ends = [end for _, end in spans]
+    sentence_cats: List[Set[str]] = [set() for _ in spans]
 
-def sentence_has_negation(sent: str) -> bool:
-    """Return True if the sentence contains a generic negation word."""
-    return any(neg in sent for neg in NEG_WORDS)
+    for end_idx, (cats, word) in hits:
+        end = end_idx + 1
+        i = bisect_left(sentence_ends, end)
+        if i < len(spans) and spans[i][0] <= end - len(word):
+            sentence_cats[i] |= cats
+    return sentence_cats
 
 
 def safety_check(text: str) -> Tuple[SafetyLevel, str]:
     """
-    Safety layer v5:
+    Safety layer v6 (same rules as v5, matched with one Aho-Corasick pass):
 
     - Emergency:
         * chest pain + (radiating OR shortness of breath OR sweating) in the SAME
@@ -40,46 +196,41 @@ def safety_check(text: str) -> Tuple[SafetyLevel, str]:
         * everything else.
     """
     t = text.lower()
-    sentences = split_sentences(text)
+    if not any(k in t for k in _QUICK_TRIGGERS):
+        return SAFE_RESULT
+
+    hits = list(AUTOMATON.iter(t))
+
+    # Categories found anywhere in the text.
+    text_cats: Set[str] = set()
+    for _, (cats, _) in hits:
+        text_cats |= cats
+
+    # Categories per sentence, only needed when a sentence-level rule can fire.
+    if text_cats.isdisjoint(SENTENCE_RULE_CATEGORIES):
+        sentence_cats: List[Set[str]] = []
+    else:
+        sentence_cats = sentence_categories(t, hits)
 
     # =============================
     # 1. HEART ATTACK CLUSTER
     # =============================
-    for s in sentences:
-        chest_pain = ("chest pain" in s) or ("胸痛" in s)
-        if chest_pain and not sentence_has_negation(s):
-            radiating = any(
-                k in s
-                for k in [
-                    "left arm",
-                    "jaw",
-                    "radiat",
-                    "back",
-                    "shoulder",
-                    "左臂",
-                    "下颌",
-                    "后背",
-                    "肩",
-                ]
-            )
-            sob = any(
-                k in s for k in ["shortness of breath", "short of breath", "气短", "呼吸困难"]
+    for cats in sentence_cats:
+        if (
+            "chest_pain" in cats
+            and "negation" not in cats
+            and not cats.isdisjoint(CHEST_PAIN_FEATURES)
+        ):
+            return (
+                "emergency",
+                "Detected severe chest pain with concerning features. "
+                "Call emergency services immediately.",
             )
-            sweating = any(k in s for k in ["sweating", "cold sweat", "大汗"])
-
-            if radiating or sob or sweating:
-                return (
-                    "emergency",
-                    "Detected severe chest pain with concerning features. "
-                    "Call emergency services immediately.",
-                )
 
     # =============================
     # 2. SEVERE BREATHING
     # =============================
-    if any(k in t for k in ["can't breathe", "cannot breathe", "unable to breathe"]) or any(
-        k in text for k in ["喘不过来", "呼吸不过来", "严重呼吸困难"]
-    ):
+    if "severe_breathing" in text_cats:
         return (
             "emergency",
             "Detected severe breathing difficulty. Call emergency services immediately.",
@@ -88,10 +239,8 @@ def safety_check(text: str) -> Tuple[SafetyLevel, str]:
     # =============================
     # 3. GI BLEEDING (sentence-level + negation)
     # =============================
-    gi_keywords = ["vomiting blood", "bloody vomit", "black stool", "tarry stool", "呕血", "黑便"]
-
-    for s in sentences:
-        if any(k in s for k in gi_keywords) and not sentence_has_negation(s):
+    for cats in sentence_cats:
+        if "gi_bleeding" in cats and "negation" not in cats:
             return (
                 "emergency",
                 "Detected possible gastrointestinal bleeding. Please seek emergency care immediately.",
@@ -100,10 +249,7 @@ def safety_check(text: str) -> Tuple[SafetyLevel, str]:
     # =============================
     # 4. STROKE
     # =============================
-    stroke_terms_en = ["sudden weakness on one side", "face drooping", "slurred speech"]
-    stroke_terms_zh = ["突然说不出话", "一侧肢体无力", "口角歪斜"]
-
-    if any(k in t for k in stroke_terms_en) or any(k in text for k in stroke_terms_zh):
+    if "stroke" in text_cats:
         return (
             "emergency",
             "Detected possible stroke symptoms. Call emergency services immediately.",
@@ -112,9 +258,7 @@ def safety_check(text: str) -> Tuple[SafetyLevel, str]:
     # =============================
     # 5. SUICIDAL IDEATION
     # =============================
-    if any(k in t for k in ["kill myself", "end my life", "suicide"]) or any(
-        k in text for k in ["自杀", "想死"]
-    ):
+    if "suicide" in text_cats:
         return (
             "emergency",
             "Detected suicidal thoughts. Immediate help is required. "
@@ -124,23 +268,7 @@ def safety_check(text: str) -> Tuple[SafetyLevel, str]:
     # =============================
     # 6. WARNING (non-emergency concern)
     # =============================
-    warning_terms_en = [
-        "shortness of breath",
-        "short of breath",
-        "blood in stool",
-        "black stool",
-        "vomiting blood",
-        "unintentional weight loss",
-        "severe pain",
-        "chest tightness",
-    ]
-    warning_terms_zh = ["气短", "便血", "体重下降", "胸闷"]
-
-    has_warning = any(w in t for w in warning_terms_en) or any(
-        w in text for w in warning_terms_zh
-    )
-
-    if has_warning:
+    if "warning" in text_cats:
         return (
             "warning",
             "Detected potentially concerning symptoms. Please seek medical evaluation soon.",
@@ -149,7 +277,4 @@ def safety_check(text: str) -> Tuple[SafetyLevel, str]:
     # =============================
     # 7. SAFE (default)
     # =============================
-    return (
-        "safe",
-        "No emergency features detected. This tool provides general health information only.",
-    )
+    return SAFE_RESULT
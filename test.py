@@ -1,7 +1,10 @@
 # test.py (safe version)
 
+import asyncio
 import os
-import requests
+import sys
+
+import httpx
 
 API_URL = "https://api-inference.huggingface.com/models/meta-llama/Meta-Llama-3-8B-Instruct"
 
@@ -12,17 +15,23 @@ if HF_API_KEY is None:
 
 headers = {"Authorization": f"Bearer {HF_API_KEY}"}
 
-def query(payload: dict) -> dict:
-    response = requests.post(API_URL, headers=headers, json=payload, timeout=60)
+DEFAULT_PROMPTS = ["Hello! Please introduce yourself briefly."]
+
+async def query(client: httpx.AsyncClient, payload: dict) -> dict:
+    response = await client.post(API_URL, headers=headers, json=payload, timeout=60.0)
     response.raise_for_status()
     return response.json()
 
-def main():
-    prompt = "Hello! Please introduce yourself briefly."
-    print("Sending prompt:", prompt)
-    out = query({"inputs": prompt})
-    print("Raw response:")
-    print(out)
+async def main(prompts: list[str]) -> None:
+    # All prompts are sent concurrently over one shared connection pool.
+    for prompt in prompts:
+        print("Sending prompt:", prompt)
+    async with httpx.AsyncClient(http2=True) as client:
+        results = await asyncio.gather(*(query(client, {"inputs": p}) for p in prompts))
+    for prompt, out in zip(prompts, results):
+        print(f"Raw response for {prompt!r}:")
+        print(out)
 
 if __name__ == "__main__":
-    main()
+    # Usage: python test.py ["prompt 1" "prompt 2" ...]
+    asyncio.run(main(sys.argv[1:] or DEFAULT_PROMPTS))